@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Generate self-signed SSL certificates for development/testing
+Uses Python's cryptography library instead of OpenSSL
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+import ipaddress
+import sys
+
+# cryptography imports live inside the functions that need them: cryptography.x509
+# alone pulls in dozens of modules, which dominates wall time for a script this
+# small. Importing this module (or running it when nothing needs regenerating
+# up to the first cert parse) stays essentially instant.
+
+@lru_cache(maxsize=None)
+def base_name_attrs():
+    """Subject/issuer attributes shared by every certificate; only the CN varies"""
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    return (
+        x509.NameAttribute(NameOID.COUNTRY_NAME, "US"),
+        x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, "State"),
+        x509.NameAttribute(NameOID.LOCALITY_NAME, "City"),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, "Organization"),
+    )
+
+@lru_cache(maxsize=None)
+def loopback_sans():
+    """Loopback SAN entries appended to every certificate"""
+    from cryptography import x509
+    return (
+        x509.IPAddress(ipaddress.IPv4Address("127.0.0.1")),
+        x509.IPAddress(ipaddress.IPv6Address("::1")),
+    )
+
+def report_crypto_backend():
+    """Print the libcrypto this run links against so a slow build is visible"""
+    try:
+        from cryptography.hazmat.backends.openssl.backend import backend
+        version = backend.openssl_version_text()
+        print(f"Using {version}")
+        # cryptography's own wheels ship an assembly-enabled libcrypto;
+        # ancient distro builds (or ones configured with no-asm) run RSA
+        # keygen and signing around an order of magnitude slower
+        if version.startswith("OpenSSL 1.0"):
+            print("[WARNING] Very old OpenSSL detected - crypto operations may run without assembly optimizations.")
+    except Exception:
+        # Backend introspection is best-effort; never block cert generation on it
+        pass
+
+def write_atomic(path, data, mode):
+    """
+    Write bytes to a temp file created with the given mode, then atomically
+    publish via os.replace. The mode applies from creation (no umask surprises,
+    no chmod round-trip) and a crashed writer can't leave a truncated file.
+    """
+    tmp = str(path) + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+def build_san_list(domain_or_ip):
+    """Subject Alternative Names for a domain or IP, always including loopback"""
+    from cryptography import x509
+    try:
+        # Try to parse as IP address
+        ip_addr = ipaddress.ip_address(domain_or_ip)
+        # It's an IP address
+        return [x509.IPAddress(ip_addr), *loopback_sans()]
+    except ValueError:
+        # It's a domain name
+        return [
+            x509.DNSName(domain_or_ip),
+            x509.DNSName(f"*.{domain_or_ip}"),
+            *loopback_sans(),
+        ]
+
+def generate_ssl_certificates():
+    """Generate self-signed SSL certificates and a shared private key"""
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    ssl_dir = Path("nginx/ssl")
+
+    # Get domains/IPs from command line arguments or environment; multiple
+    # domains share one process start-up and one private key
+    if len(sys.argv) > 1:
+        domains = sys.argv[1:]
+    else:
+        domains = os.getenv("DOMAIN", "localhost").split(",")
+    domains = [d.strip() for d in domains if d.strip()]
+
+    # Naming is decided by the full requested list, not by how many certs
+    # happen to need regeneration after the skip filter below prunes domains
+    multi_domain = len(domains) > 1
+
+    # Create SSL directory if it doesn't exist
+    ssl_dir.mkdir(parents=True, exist_ok=True)
+
+    key_path = ssl_dir / "key.pem"
+
+    def cert_path_for(domain):
+        # Single-domain runs keep the cert.pem name the nginx config expects
+        return ssl_dir / (f"{domain}.pem" if multi_domain else "cert.pem")
+
+    # Skip domains whose existing certificate stays valid for at least another
+    # 30 days. Set FORCE_REGEN=1 to regenerate everything.
+    all_domains = list(domains)
+    skipped_any = False
+    if os.getenv("FORCE_REGEN", "0") != "1" and key_path.exists():
+        pending = []
+        for domain in domains:
+            cert_path = cert_path_for(domain)
+            if cert_path.exists():
+                try:
+                    existing = x509.load_pem_x509_certificate(cert_path.read_bytes())
+                    common_name = existing.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value
+                    remaining = existing.not_valid_after_utc - datetime.now(timezone.utc)
+                    if common_name == domain and remaining > timedelta(days=30):
+                        print(f"Existing certificate for {domain} is valid for another {remaining.days} days - skipping.")
+                        skipped_any = True
+                        continue
+                except Exception as e:
+                    print(f"Could not validate existing certificate for {domain} ({e}) - regenerating...")
+            pending.append(domain)
+        domains = pending
+
+    if not domains:
+        print("All certificates are up to date - nothing to do.")
+        print("Set FORCE_REGEN=1 to regenerate anyway.")
+        return
+
+    # Certificates being kept were signed with the existing key, so any cert
+    # generated now must share that key or the retained cert/key pairs stop
+    # matching and nginx rejects them. Only generate a fresh key when no cert
+    # is being kept; if the existing key is unreadable, regenerate everything.
+    private_key = None
+    key_alg = os.getenv("KEY_ALG", "ed25519").lower()
+    if skipped_any:
+        try:
+            private_key = serialization.load_pem_private_key(key_path.read_bytes(), password=None)
+            key_alg = "rsa" if isinstance(private_key, rsa.RSAPrivateKey) else "ed25519"
+            print(f"Reusing existing {key_alg} private key so retained certificates stay paired...")
+        except Exception as e:
+            print(f"Could not load existing private key ({e}) - regenerating all certificates...")
+            domains = all_domains
+            skipped_any = False
+
+    if private_key is None:
+        # Generate one private key shared by all certificates - Ed25519 by
+        # default: keygen takes microseconds versus hundreds of ms for
+        # RSA-2048, and nginx/modern browsers accept EdDSA certs. Set
+        # KEY_ALG=rsa for TLS clients without EdDSA support. Signing is cheap
+        # compared to keygen, so additional domains are effectively free.
+        print(f"Generating {key_alg} private key...")
+        if key_alg == "rsa":
+            try:
+                # Pre-seed OpenSSL's DRBG in one bulk call so Miller-Rabin
+                # candidate generation steps the userspace PRNG instead of
+                # repeatedly pulling from the system entropy source
+                from cryptography.hazmat.bindings.openssl.binding import Binding
+                seed = os.urandom(256)
+                Binding().lib.RAND_add(seed, len(seed), 256.0)
+            except Exception:
+                # Seeding is an optimization only - OpenSSL self-seeds regardless
+                pass
+            private_key = rsa.generate_private_key(
+                public_exponent=65537,
+                key_size=2048,
+            )
+        else:
+            private_key = ed25519.Ed25519PrivateKey.generate()
+
+    # One timestamp for every certificate in the run: saves a syscall and
+    # datetime construction per builder call, and keeps not_valid_before/
+    # not_valid_after exactly consistent instead of microseconds apart
+    now = datetime.now(timezone.utc)
+
+    cert_paths = []
+    pending_writes = []
+    for domain_or_ip in domains:
+        print(f"Generating certificate for {domain_or_ip}...")
+        subject = issuer = x509.Name(
+            base_name_attrs() + (x509.NameAttribute(NameOID.COMMON_NAME, domain_or_ip),)
+        )
+
+        cert = x509.CertificateBuilder().subject_name(
+            subject
+        ).issuer_name(
+            issuer
+        ).public_key(
+            private_key.public_key()
+        ).serial_number(
+            x509.random_serial_number()
+        ).not_valid_before(
+            now
+        ).not_valid_after(
+            now + timedelta(days=365)
+        ).add_extension(
+            x509.SubjectAlternativeName(build_san_list(domain_or_ip)),
+            critical=False,
+        ).sign(private_key, hashes.SHA256() if key_alg == "rsa" else None)  # Ed25519 picks its own hash
+
+        cert_path = cert_path_for(domain_or_ip)
+        pending_writes.append((cert_path, cert.public_bytes(serialization.Encoding.PEM), 0o644))
+        cert_paths.append(cert_path)
+
+    # Private key is owner-only from the moment it exists; a reused key is
+    # already on disk and must not be rewritten
+    if not skipped_any:
+        pending_writes.append((key_path, private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ), 0o600))
+
+    # All PEM bytes are materialized above; the files are independent inodes,
+    # so the writes themselves can overlap
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for future in [executor.submit(write_atomic, *w) for w in pending_writes]:
+            future.result()
+
+    # Use ASCII-safe characters for Windows console
+    print("\n[SUCCESS] SSL certificate generated successfully!")
+    for cert_path in cert_paths:
+        print(f"  Certificate: {cert_path}")
+    print(f"  Private Key: {key_path}")
+    print("")
+    print("[WARNING] This is a self-signed certificate for development only.")
+    print("          Browsers will show a security warning. For production, use Let's Encrypt.")
+
+if __name__ == "__main__":
+    report_crypto_backend()
+    generate_ssl_certificates()